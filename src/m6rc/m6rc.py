@@ -15,9 +15,10 @@
 """Command-line tool to parse Metaphor files and generate AI prompts."""
 
 import argparse
+import errno
 import os
+import stat
 import sys
-from pathlib import Path
 from typing import List, Optional
 
 from m6rclib import (
@@ -90,11 +91,23 @@ def process_input(input_source: str, search_paths: List[str]) -> tuple[Optional[
 
     try:
         if input_source == '-':
-            input_text = sys.stdin.read()
+            # Read stdin in one shot and decode it as UTF-8, matching how the parser reads files
+            input_text = sys.stdin.buffer.read().decode('utf-8')
             syntax_tree = metaphor_parser.parse(input_text, "<stdin>", search_paths)
         else:
-            if not Path(input_source).exists():
-                print(f"Error: File not found: {input_source}", file=sys.stderr)
+            # Probe the input up front so problems opening it are reported as such, rather than as syntax errors
+            try:
+                input_stat = os.stat(input_source)
+            except OSError as e:
+                print(f"Error: Cannot open input file: {e.strerror}: {input_source}", file=sys.stderr)
+                return None, 3
+
+            if stat.S_ISDIR(input_stat.st_mode):
+                print(f"Error: Cannot open input file: {os.strerror(errno.EISDIR)}: {input_source}", file=sys.stderr)
+                return None, 3
+
+            if not os.access(input_source, os.R_OK):
+                print(f"Error: Cannot open input file: {os.strerror(errno.EACCES)}: {input_source}", file=sys.stderr)
                 return None, 3
 
             try:
@@ -122,7 +135,8 @@ def write_output(content: str, output_file: Optional[str]) -> int:
         int: Exit code (0 for success, 4 for output error)
     """
     if not output_file:
-        print(content)
+        # Emit the prompt and its trailing newline with a single write rather than the two that print() uses
+        sys.stdout.write(f"{content}\n")
         return 0
 
     try:
@@ -185,6 +199,9 @@ def main() -> int:
     if not search_paths:
         search_paths.append(os.getcwd())
 
+    # The parser probes every search path for each include and embed, so drop any duplicates
+    search_paths = list(dict.fromkeys(search_paths))
+
     # Process input file
     output, exit_code = process_input(args.input_file, search_paths)
     if exit_code != 0:
@@ -20,8 +20,12 @@ supporting both positive and negative test cases with parallel execution capabil
 """
 
 import argparse
-import concurrent.futures
+import asyncio
+import functools
 import json
+import os
+import shlex
+import signal
 import subprocess
 import sys
 from multiprocessing import cpu_count
@@ -30,6 +34,23 @@ from pathlib import Path
 # Default timeout in milliseconds
 DEFAULT_TIMEOUT = 5000
 
+# Keys and test types accepted in a test configuration
+MANDATORY_KEYS = frozenset({"command", "type"})
+VALID_KEYS = frozenset({"command", "type", "expected", "timeout"})
+VALID_TYPES = frozenset({"positive", "negative"})
+
+# Characters that mean a test command needs a shell to run it
+SHELL_METACHARACTERS = frozenset("|&;<>()$`*?[~\n#{}!")
+
+# Shell builtins and keywords, which cannot be run without a shell
+SHELL_BUILTINS = frozenset({
+    ".", ":", "alias", "bg", "break", "case", "cd", "command", "continue", "do", "done", "elif", "else",
+    "esac", "eval", "exec", "exit", "export", "false", "fc", "fg", "fi", "for", "function", "getopts",
+    "hash", "if", "in", "jobs", "local", "read", "readonly", "return", "select", "set", "shift", "source",
+    "then", "time", "times", "trap", "true", "type", "ulimit", "umask", "unalias", "unset", "until",
+    "wait", "while"
+})
+
 def parse_config_file(config_file: str) -> list:
     """
     Parse and validate the test configuration file.
@@ -60,7 +81,7 @@ def parse_config_file(config_file: str) -> list:
 
 def validate_test_config(test: dict, line_number: int) -> None:
     """
-    Validate a single test configuration.
+    Validate a single test configuration and prepare it to be run.
 
     Args:
         test: Dictionary containing test configuration.
@@ -69,95 +90,167 @@ def validate_test_config(test: dict, line_number: int) -> None:
     Raises:
         SystemExit: If the test configuration is invalid.
     """
-    mandatory_keys = {"command", "type"}
-    valid_keys = {"command", "type", "expected", "timeout"}
-    valid_types = {"positive", "negative"}
-
     # Check for invalid keys
-    invalid_keys = set(test.keys()) - valid_keys
+    invalid_keys = test.keys() - VALID_KEYS
     if invalid_keys:
         print(f"Invalid key(s) '{', '.join(invalid_keys)}' found in configuration on line {line_number}.")
         sys.exit(1)
 
     # Check for missing mandatory keys
-    missing_keys = mandatory_keys - set(test.keys())
+    missing_keys = MANDATORY_KEYS - test.keys()
     if missing_keys:
         print(f"Mandatory keys missing in test configuration on line {line_number}: {missing_keys}")
         sys.exit(1)
 
     # Validate test type
-    if test["type"] not in valid_types:
+    if test["type"] not in VALID_TYPES:
         print(f"Invalid test type '{test['type']}' in configuration on line {line_number}.")
         sys.exit(1)
 
-    # Validate expected file exists if specified
+    # Split the command up front so tests that plainly don't need a shell can be started directly
+    command = test["command"]
+    test["argv"] = None
+    if not any(c in SHELL_METACHARACTERS for c in command):
+        # Commands shlex can't split (e.g. unbalanced quotes) are left for the shell to run and report
+        try:
+            argv = shlex.split(command)
+        except ValueError:
+            argv = []
+
+        # Empty commands, variable assignments and builtins all need the shell to interpret them
+        if argv and "=" not in argv[0] and argv[0] not in SHELL_BUILTINS:
+            test["argv"] = argv
+
+    # Validate expected file exists if specified, and load it so each test compares in memory
     if "expected" in test:
         expected_file = Path(test["expected"])
         if not expected_file.is_file():
             print(f"Expected results file '{expected_file}' not found for test on line {line_number}.")
             sys.exit(1)
 
-def run_test(test: dict) -> tuple:
+        # A read failure is recorded against this test rather than stopping the whole run
+        try:
+            test["expected_output"] = read_expected_output(str(expected_file.resolve()))
+        except IOError as e:
+            test["expected_error"] = str(e)
+
+@functools.lru_cache(maxsize=None)
+def read_expected_output(filename: str) -> bytes:
+    """
+    Read an expected results file, reusing the contents if several tests share the same file.
+
+    Args:
+        filename: Resolved path to the expected results file.
+
+    Returns:
+        Raw contents of the expected results file.
+
+    Raises:
+        IOError: If the file cannot be read.
+    """
+    with open(filename, 'rb') as file:
+        return file.read()
+
+def kill_process_group(process: asyncio.subprocess.Process) -> None:
+    """
+    Kill a test process along with anything it started.
+
+    Args:
+        process: Test process, which leads its own process group.
+    """
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+async def run_test(test: dict, semaphore: asyncio.Semaphore) -> tuple:
     """
     Execute a single test case and validate its results.
 
     Args:
         test: Dictionary containing test configuration.
+        semaphore: Semaphore limiting how many tests run at the same time.
 
     Returns:
         Tuple of (status, command, output) where status is either "PASS" or "FAIL".
     """
     command = test["command"]
+    argv = test["argv"]
     test_type = test["type"]
     timeout = test.get("timeout", DEFAULT_TIMEOUT)
-    expected_file = test.get("expected")
+    expected_output = test.get("expected_output")
+    expected_error = test.get("expected_error")
 
-    print(f"Start {command}")
-
-    try:
-        process = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True
-        )
+    async with semaphore:
+        print(f"Start {command}")
 
         try:
-            stdout, _ = process.communicate(timeout=timeout / 1000)
-            exit_code = process.returncode
-        except subprocess.TimeoutExpired:
-            # Kill the process if it times out
-            process.kill()
-            process.wait()
-            return "FAIL", command, f"Test timed out after {timeout} ms"
+            # Only pay for an extra shell process when the command actually needs one
+            process = None
+            if argv is not None:
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        *argv,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        start_new_session=True
+                    )
+                except OSError:
+                    # The program couldn't be started directly, so let the shell run (or report) it as it always has
+                    process = None
+
+            if process is None:
+                process = await asyncio.create_subprocess_shell(
+                    command,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True
+                )
 
-        # Check exit code matches test type
-        if test_type == "positive" and exit_code != 0:
-            return "FAIL", command, stdout
+            try:
+                stdout_data, _ = await asyncio.wait_for(process.communicate(), timeout / 1000)
+                exit_code = process.returncode
+            except asyncio.TimeoutError:
+                # Kill the process if it times out
+                kill_process_group(process)
+                await process.wait()
+                return "FAIL", command, f"Test timed out after {timeout} ms"
+            finally:
+                # Tests run in their own session, so if we're interrupted (e.g. Ctrl-C) clean them up ourselves
+                if process.returncode is None:
+                    kill_process_group(process)
 
-        if test_type == "negative" and exit_code == 0:
-            return "FAIL", command, stdout
+            # Output is only decoded for reporting; the expected results check compares raw bytes
+            stdout = stdout_data.decode('utf-8', errors='replace')
 
-        # Compare output with expected results if specified
-        if expected_file:
-            try:
-                with open(expected_file, 'r') as file:
-                    expected_output = file.read()
-                    if stdout != expected_output:
-                        return "FAIL", command, stdout
-            except IOError as e:
-                return "FAIL", command, f"Error reading expected results file: {e}"
+            # Check exit code matches test type
+            if test_type == "positive" and exit_code != 0:
+                return "FAIL", command, stdout
+
+            if test_type == "negative" and exit_code == 0:
+                return "FAIL", command, stdout
+
+            if expected_error is not None:
+                return "FAIL", command, f"Error reading expected results file: {expected_error}"
 
-        return "PASS", command, stdout
+            # Compare output with expected results if specified
+            if expected_output is not None and stdout_data != expected_output:
+                return "FAIL", command, stdout
 
-    except Exception as e:
-        return "FAIL", command, str(e)
+            return "PASS", command, stdout
 
-def execute_tests(config: list, max_parallel_tests: int) -> list:
+        except Exception as e:
+            return "FAIL", command, str(e)
+
+async def execute_tests(config: list, max_parallel_tests: int) -> list:
     """
     Execute all tests in parallel up to the specified limit.
 
+    All child processes are driven from a single event loop rather than a thread per running test.
+
     Args:
         config: List of test configurations.
         max_parallel_tests: Maximum number of tests to run in parallel.
@@ -165,19 +258,26 @@ def execute_tests(config: list, max_parallel_tests: int) -> list:
     Returns:
         List of test results.
     """
+    semaphore = asyncio.Semaphore(max_parallel_tests)
     results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_parallel_tests) as executor:
-        futures = {executor.submit(run_test, test): test for test in config}
 
-        for future in concurrent.futures.as_completed(futures):
-            result = future.result()
-            results.append(result)
-            status, command, _ = result
+    # Only colour the results when they're going to a terminal
+    if sys.stdout.isatty():
+        pass_label = "\033[92mPASS:\033[0m"
+        fail_label = "\033[91mFAIL:\033[0m"
+    else:
+        pass_label = "PASS:"
+        fail_label = "FAIL:"
 
-            if status == "PASS":
-                print(f"\033[92mPASS:\033[0m {command}")
-            else:
-                print(f"\033[91mFAIL:\033[0m {command}")
+    for future in asyncio.as_completed([run_test(test, semaphore) for test in config]):
+        result = await future
+        results.append(result)
+        status, command, _ = result
+
+        if status == "PASS":
+            print(f"{pass_label} {command}")
+        else:
+            print(f"{fail_label} {command}")
 
     return results
 
@@ -213,10 +313,16 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     parser.add_argument("config_file", help="Path to the JSON configuration file")
+    # Default to the CPUs we are allowed to run on, which may be fewer than the machine has
+    if hasattr(os, "sched_getaffinity"):
+        default_parallel_tests = len(os.sched_getaffinity(0))
+    else:
+        default_parallel_tests = cpu_count()
+
     parser.add_argument(
         "--parallel-tests",
         type=int,
-        default=cpu_count(),
+        default=default_parallel_tests,
         help="Maximum number of parallel tests"
     )
 
@@ -227,7 +333,7 @@ def main():
         sys.exit(1)
 
     config = parse_config_file(args.config_file)
-    results = execute_tests(config, args.parallel_tests)
+    results = asyncio.run(execute_tests(config, args.parallel_tests))
     all_tests_passed = summarize_results(results)
 
     sys.exit(0 if all_tests_passed else 1)